@@ -1,143 +1,600 @@
 import os
-from datetime import datetime, timedelta
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
 import json
+import orjson
+import hashlib
+import importlib.util
+import httpx
 import anthropic
 from dotenv import load_dotenv
+from aioconsole import ainput
+import diskcache
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+_now = datetime.now
+
+ANALYZE_MODEL = "claude-3-5-haiku-latest"
+REASONING_MODEL = "claude-3-5-sonnet-latest"
+MAX_REQUESTS_PER_MINUTE = 50
+MAX_TOKENS_PER_MINUTE = 40000
+MAX_BATCH_PROMPT_CHARS = 8000
+MAX_CONCURRENCY = 8
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=100)
+HTTP_TIMEOUT = 60.0
+# HTTP/2 needs the optional h2 package (pip install httpx[http2]); fall back to HTTP/1.1 without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+ANALYSIS_MAX_TOKENS = 400
+REVIEW_MAX_TOKENS = 600
+MODEL_MAX_OUTPUT_TOKENS = {
+    "claude-3-sonnet-20240229": 4096,
+    "claude-3-5-haiku-latest": 8192,
+    "claude-3-5-sonnet-latest": 8192,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+TASKS_FILE = 'tasks.jsonl'
+LEGACY_TASKS_FILE = 'tasks.json'
+PENDING_BATCH_FILE = 'pending_batch.json'
+IO_BUFFER_SIZE = 1 << 16
+
+ANALYZE_SYSTEM_PROMPT = """Analyze each of the tasks the user lists and return a JSON object with a "tasks" list
+where element i corresponds to task i.
+Each element must be a JSON object with:
+1. "priority": suggested priority (high/medium/low)
+2. "estimated_time_to_complete": estimated time to complete (in hours)
+3. "category": category (e.g., development, writing, research)
+4. "potential_subtasks": list of any potential subtasks
+Base this on the task descriptions and common project management practices."""
+
+RECOMMEND_SYSTEM_PROMPT = """Given the user's tasks, provide recommendations for:
+1. Which task should be done next and why
+2. Any tasks that might be related or could be combined
+3. Suggestions for optimal task scheduling
+Consider priorities, deadlines, and task relationships in your analysis."""
+
+REPORT_SYSTEM_PROMPT = """Based on the user's task data, generate a concise progress report that includes:
+1. Overall progress summary
+2. Key achievements
+3. Areas needing attention
+4. Suggestions for improving productivity
+Use a professional but engaging tone."""
+
+# Plain-text sections rather than JSON, so the requested section can be printed while it streams in
+REVIEW_HEADERS = {
+    'recommendations': "=== RECOMMENDATIONS ===",
+    'progress_report': "=== PROGRESS REPORT ==="
+}
+
+REVIEW_SYSTEM_PROMPT = f"""Review the user's task data and answer in two sections, each starting with its header
+line exactly as shown below.
+
+{REVIEW_HEADERS['recommendations']}
+{RECOMMEND_SYSTEM_PROMPT}
+
+{REVIEW_HEADERS['progress_report']}
+{REPORT_SYSTEM_PROMPT}"""
+
+
+def cached_system_prompt(text):
+    """Mark a fixed system prompt as cacheable so repeated requests reuse its prefix"""
+    # Anthropic only caches prefixes of at least 1024 tokens (2048 for Haiku). The prompts here are
+    # ~100 tokens, so this is a no-op until they grow past that size.
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+# Only transient failures are worth retrying; bad requests and auth errors fail straight away
+api_retry = retry(
+    retry=retry_if_exception_type((
+        anthropic.RateLimitError,
+        anthropic.APIConnectionError,
+        anthropic.APITimeoutError,
+        anthropic.InternalServerError
+    )),
+    wait=wait_random_exponential(min=1, max=60),
+    stop=stop_after_attempt(6),
+    reraise=True
+)
+
+
+def is_valid_review(review):
+    return isinstance(review, dict) and all(
+        isinstance(review.get(field), str) for field in ('recommendations', 'progress_report')
+    )
+
+
+def parse_review(text):
+    """Split the combined review reply into its sections"""
+    starts = {field: text.find(header) for field, header in REVIEW_HEADERS.items()}
+    bounds = sorted(starts.values()) + [len(text)]
+    review = {}
+    for field, start in starts.items():
+        if start < 0:
+            break
+        end = bounds[bounds.index(start) + 1]
+        review[field] = text[start + len(REVIEW_HEADERS[field]):end].strip()
+    if not is_valid_review(review) or not all(review.values()):
+        raise ValueError("The AI review came back malformed, please try again")
+    return review
+
+
+class SectionPrinter:
+    """Print one section of a streamed review as its text arrives"""
+    def __init__(self, field):
+        self.header = REVIEW_HEADERS[field]
+        self.others = [h for f, h in REVIEW_HEADERS.items() if f != field]
+        # A header split across chunks must not be printed as section text
+        self.holdback = max(len(h) for h in REVIEW_HEADERS.values()) - 1
+        self.text = ""
+        self.printed = 0
+
+    def restart(self):
+        """Start over on a new attempt; the retried reply will not match what is already on screen"""
+        if self.printed:
+            print("\n[connection lost, retrying]\n", flush=True)
+        self.text = ""
+        self.printed = 0
+
+    def feed(self, chunk):
+        self.text += chunk
+        start = self.text.find(self.header)
+        if start < 0:
+            return
+        start += len(self.header)
+        ends = [i for i in (self.text.find(h, start) for h in self.others) if i >= 0]
+        end = min(ends) if ends else max(start, len(self.text) - self.holdback)
+        self._show(self.text[start:end].strip())
+
+    def finish(self, section):
+        """Print whatever of the final section has not been shown yet"""
+        self._show(section)
+        print(flush=True)
+
+    def _show(self, visible):
+        print(visible[self.printed:], end="", flush=True)
+        self.printed = max(self.printed, len(visible))
+
+
+def consume_exception(task):
+    """Mark a background task's failure as retrieved so asyncio doesn't print it over the prompt"""
+    if not task.cancelled():
+        task.exception()
+
+
+_write_buffer = bytearray()
+
+
+def encode_records(records):
+    """Serialize records as JSON lines into a reused module-level buffer"""
+    _write_buffer.clear()
+    for record in records:
+        _write_buffer.extend(orjson.dumps(record))
+        _write_buffer.extend(b'\n')
+    return _write_buffer
+
+
+class RateLimiter:
+    """Sliding one-minute window over the requests and tokens sent to the API"""
+    def __init__(self, max_requests_per_minute, max_tokens_per_minute):
+        self.max_requests = max_requests_per_minute
+        self.max_tokens = max_tokens_per_minute
+        self.window = deque()
+        self.tokens_used = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= 60:
+                    _, expired = self.window.popleft()
+                    self.tokens_used -= expired
+                if not self.window or (len(self.window) < self.max_requests
+                                       and self.tokens_used + tokens <= self.max_tokens):
+                    self.window.append((now, tokens))
+                    self.tokens_used += tokens
+                    return
+                await asyncio.sleep(60 - (now - self.window[0][0]))
+
 
 class AITaskAgent:
-    def __init__(self, api_key):
+    def __init__(self, api_key, analyze_model=ANALYZE_MODEL, reasoning_model=REASONING_MODEL):
         self.tasks = self.load_tasks()
+        self._by_id = {t['id']: t for t in self.tasks}
+        self._n_completed = sum(1 for t in self.tasks if t['status'] == 'completed')
+        self._n_pending = len(self.tasks) - self._n_completed
         self.task_history = []
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.pending_batch = self.load_pending_batch()
+        # Small model for structured analysis, stronger model for recommendations and reports
+        self.analyze_model = analyze_model
+        self.reasoning_model = reasoning_model
+        self._revision = 0
+        self._summary = None
+        self._summary_key = None
+        self._review = None
+        self._review_revision = None
+        self._prefetch = None
+        self._prefetch_revision = None
+        self.cache = diskcache.Cache('.llm_cache')
+        self.rate_limiter = RateLimiter(MAX_REQUESTS_PER_MINUTE, MAX_TOKENS_PER_MINUTE)
+        # One keep-alive connection pool for every request the agent makes
+        self.http_client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, http_client=self.http_client)
+
+    async def aclose(self):
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+        await self.http_client.aclose()
 
     def load_tasks(self):
+        # Replay the append-only log: task records, then completion ops on top of them
+        tasks = {}
+        self._log_length = 0
+        self._next_id = 1
+        try:
+            with open(TASKS_FILE, 'rb', buffering=IO_BUFFER_SIZE) as f:
+                data = f.read()
+            # A crash can stop an append anywhere, even between a record and its newline.
+            # Compacting then keeps the next append from being glued onto that last line.
+            torn = bool(data) and not data.endswith(b'\n')
+            lines = [line for line in data.splitlines() if line.strip()]
+            for i, line in enumerate(lines):
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A crash mid-append can leave a partial last line; anything earlier is real corruption
+                    if i < len(lines) - 1:
+                        raise
+                    torn = True
+                    break
+                self._log_length += 1
+                op = record.get('op')
+                if op == 'meta':
+                    self._next_id = max(self._next_id, record['next_id'])
+                elif op == 'complete':
+                    task = tasks.get(record['id'])
+                    if task:
+                        task['status'] = 'completed'
+                        task['completed_at'] = record['ts']
+                else:
+                    tasks[record['id']] = record
+                    self._next_id = max(self._next_id, record['id'] + 1)
+        except FileNotFoundError:
+            pass
+        else:
+            if torn:
+                # Rewrite the log without the partial line so later appends start on a fresh line
+                self._write_tasks(list(tasks.values()))
+            return list(tasks.values())
+
         try:
-            with open('tasks.json', 'r') as f:
-                return json.load(f)
+            with open(LEGACY_TASKS_FILE, 'rb', buffering=IO_BUFFER_SIZE) as f:
+                legacy_tasks = orjson.loads(f.read())
         except FileNotFoundError:
             return []
+        self._next_id = max((t['id'] for t in legacy_tasks), default=0) + 1
+        self._write_tasks(legacy_tasks)
+        return legacy_tasks
+
+    def load_pending_batch(self):
+        try:
+            with open(PENDING_BATCH_FILE, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def _save_pending_batch(self, pending):
+        if pending is None:
+            os.remove(PENDING_BATCH_FILE)
+        else:
+            tmp_path = PENDING_BATCH_FILE + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(pending))
+            os.replace(tmp_path, PENDING_BATCH_FILE)
+        self.pending_batch = pending
+
+    def _write_tasks(self, tasks):
+        tmp_path = TASKS_FILE + '.tmp'
+        with open(tmp_path, 'wb', buffering=IO_BUFFER_SIZE) as f:
+            # The meta record keeps ids monotonic even if tasks are ever dropped from the log
+            f.write(encode_records([{'op': 'meta', 'next_id': self._next_id}, *tasks]))
+        os.replace(tmp_path, TASKS_FILE)
+        self._log_length = len(tasks) + 1
 
     def save_tasks(self):
-        with open('tasks.json', 'w') as f:
-            json.dump(self.tasks, f, indent=2)
+        """Compact the log into one record per task"""
+        self._write_tasks(self.tasks)
+
+    def _append_log(self, records):
+        with open(TASKS_FILE, 'ab', buffering=IO_BUFFER_SIZE) as f:
+            f.write(encode_records(records))
+        self._log_length += len(records)
+        self._revision += 1
+        if self._log_length > 2 * len(self.tasks):
+            self.save_tasks()
 
-    def analyze_task_description(self, description):
+    async def analyze_task_description(self, description):
         """Use AI to analyze the task and suggest priority, deadline, and categorization"""
-        prompt = f"""Analyze this task: "{description}"
-        Provide a JSON response with:
-        1. Suggested priority (high/medium/low)
-        2. Estimated time to complete (in hours)
-        3. Category (e.g., development, writing, research)
-        4. Any potential subtasks
-        Base this on the task description and common project management practices."""
-
-        message = self.client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=1000,
+        key = self._cache_key(self.analyze_model, ANALYZE_SYSTEM_PROMPT, self._analysis_prompt([description]))
+        if key in self.cache:
+            return self.cache[key]
+
+        analyses = await self.analyze_task_descriptions([description])
+        self.cache[key] = analyses[0]
+        return analyses[0]
+
+    def _cache_key(self, model, system_prompt, prompt):
+        return hashlib.sha256((model + system_prompt + prompt).encode()).hexdigest()
+
+    async def analyze_task_descriptions(self, descriptions):
+        """Use AI to analyze several tasks, one analysis per description"""
+        # Pack as many tasks into each request as the model's output limit allows
+        per_request = max(1, self._max_output_tokens(self.analyze_model) // ANALYSIS_MAX_TOKENS)
+        chunks = [descriptions[i:i + per_request] for i in range(0, len(descriptions), per_request)]
+        results = await asyncio.gather(*[self._analyze_chunk(chunk) for chunk in chunks])
+        return [analysis for analyses in results for analysis in analyses]
+
+    def _max_output_tokens(self, model):
+        return MODEL_MAX_OUTPUT_TOKENS.get(model, DEFAULT_MAX_OUTPUT_TOKENS)
+
+    @api_retry
+    async def _analyze_chunk(self, descriptions):
+        prompt = self._analysis_prompt(descriptions)
+        max_tokens = min(ANALYSIS_MAX_TOKENS * len(descriptions), self._max_output_tokens(self.analyze_model))
+        # Rough estimate of ~4 characters per token; the output budget counts toward the limit too
+        await self.rate_limiter.acquire((len(ANALYZE_SYSTEM_PROMPT) + len(prompt)) // 4 + max_tokens)
+
+        message = await self.client.messages.create(
+            model=self.analyze_model,
+            max_tokens=max_tokens,
+            temperature=0,
+            system=cached_system_prompt(ANALYZE_SYSTEM_PROMPT),
             messages=[
                 {
                     "role": "user",
                     "content": prompt
+                },
+                # Prefilling the opening brace keeps Claude from adding a preamble or code fences
+                {
+                    "role": "assistant",
+                    "content": "{"
                 }
             ]
         )
-        return json.loads(message.content[0].text)
+        analyses = json.loads("{" + message.content[0].text)['tasks']
+        if len(analyses) != len(descriptions):
+            raise ValueError(f"Expected {len(descriptions)} analyses, got {len(analyses)}")
+        return analyses
 
-    def add_task(self, description):
-        # Use CL-AI to analyze the task
-        analysis = self.analyze_task_description(description)
-        
-        task = {
-            'id': len(self.tasks) + 1,
+    async def _bounded_analyze(self, sem, description):
+        async with sem:
+            return await self.analyze_task_description(description)
+
+    async def analyze_task_descriptions_parallel(self, descriptions, max_concurrency=MAX_CONCURRENCY):
+        """Analyze each task in its own request, at most max_concurrency in flight"""
+        sem = asyncio.Semaphore(max_concurrency)
+        return await asyncio.gather(*[self._bounded_analyze(sem, d) for d in descriptions])
+
+    def _analysis_prompt(self, descriptions):
+        return "\n".join(f'{i}. "{d}"' for i, d in enumerate(descriptions))
+
+    def _insert_task(self, task):
+        self.tasks.append(task)
+        self._by_id[task['id']] = task
+        self._n_pending += 1
+
+    def _build_task(self, description, analysis):
+        task_id = self._next_id
+        self._next_id += 1
+        return {
+            'id': task_id,
             'description': description,
-            'created_at': datetime.now().isoformat(),
+            'created_at': _now().isoformat(),
             'priority': analysis['priority'],
             'estimated_hours': analysis['estimated_time_to_complete'],
             'category': analysis['category'],
             'subtasks': analysis['potential_subtasks'],
             'status': 'pending'
         }
-        self.tasks.append(task)
-        self.save_tasks()
-        return f"Added task with AI analysis: {task}"
 
-    def get_smart_recommendations(self):
-        """Use AI to provide intelligent task recommendations"""
-        if not self.tasks:
-            return "No tasks available for analysis"
+    async def add_task(self, description):
+        # Use CL-AI to analyze the task
+        analysis = await self.analyze_task_description(description)
+        
+        task = self._build_task(description, analysis)
+        self._insert_task(task)
+        self._append_log([task])
+        return f"Added task with AI analysis: {task}"
 
-        tasks_context = "\n".join([
-            f"Task {t['id']}: {t['description']} (Priority: {t['priority']}, Status: {t['status']})"
-            for t in self.tasks
-        ])
+    async def add_tasks(self, descriptions):
+        # Analyze every description in one round-trip unless the prompt would get too long, then save once
+        if sum(len(d) for d in descriptions) > MAX_BATCH_PROMPT_CHARS:
+            analyses = await self.analyze_task_descriptions_parallel(descriptions)
+        else:
+            analyses = await self.analyze_task_descriptions(descriptions)
+        added = []
+        for description, analysis in zip(descriptions, analyses):
+            task = self._build_task(description, analysis)
+            self._insert_task(task)
+            added.append(task)
+        self._append_log(added)
+        return f"Added {len(added)} tasks with AI analysis: {added}"
 
-        prompt = f"""Given these tasks:
-        {tasks_context}
-        
-        Provide recommendations for:
-        1. Which task should be done next and why
-        2. Any tasks that might be related or could be combined
-        3. Suggestions for optimal task scheduling
-        Consider priorities, deadlines, and task relationships in your analysis."""
-
-        message = self.client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=1000,
-            messages=[
+    async def bulk_add_tasks(self, descriptions):
+        """Submit tasks to the Message Batches API (half price, up to 24h turnaround); check_batch collects them later"""
+        batch = await self.client.messages.batches.create(
+            requests=[
                 {
-                    "role": "user",
-                    "content": prompt
+                    "custom_id": str(i),
+                    "params": {
+                        "model": self.analyze_model,
+                        "max_tokens": ANALYSIS_MAX_TOKENS,
+                        "temperature": 0,
+                        "system": cached_system_prompt(ANALYZE_SYSTEM_PROMPT),
+                        "messages": [
+                            {
+                                "role": "user",
+                                "content": self._analysis_prompt([description])
+                            },
+                            {
+                                "role": "assistant",
+                                "content": "{"
+                            }
+                        ]
+                    }
                 }
+                for i, description in enumerate(descriptions)
             ]
         )
-        return message.content[0].text
+        # Saved next to the task log so the batch survives a restart of the app
+        self._save_pending_batch({'batch_id': batch.id, 'descriptions': descriptions})
+        return f"Submitted batch {batch.id} with {len(descriptions)} tasks, choose option 7 again to check on it"
 
-    def generate_progress_report(self):
-        """Use AI to generate a natural language progress report"""
-        completed = [t for t in self.tasks if t['status'] == 'completed']
-        pending = [t for t in self.tasks if t['status'] == 'pending']
+    async def check_batch(self):
+        """Add the tasks from the pending batch if it has finished, otherwise report its status"""
+        batch = await self.client.messages.batches.retrieve(self.pending_batch['batch_id'])
+        if batch.processing_status != "ended":
+            return f"Batch {batch.id} is still {batch.processing_status}, check again later"
+        descriptions = self.pending_batch['descriptions']
 
-        context = f"""
-        Completed Tasks: {len(completed)}
-        Pending Tasks: {len(pending)}
-        Task Details: {json.dumps(self.tasks, indent=2)}
-        """
+        analyses = {}
+        malformed = 0
+        async for entry in await self.client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                continue
+            text = entry.result.message.content[0].text
+            # A cut-off or non-JSON reply only loses that one task, not the whole batch
+            try:
+                analyses[int(entry.custom_id)] = json.loads("{" + text)['tasks'][0]
+            except (ValueError, KeyError, IndexError):
+                malformed += 1
 
-        prompt = f"""Based on this task data:
-        {context}
-        
-        Generate a concise progress report that includes:
-        1. Overall progress summary
-        2. Key achievements
-        3. Areas needing attention
-        4. Suggestions for improving productivity
-        Use a professional but engaging tone."""
-
-        message = self.client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=1000,
+        added = []
+        for i, description in enumerate(descriptions):
+            if i not in analyses:
+                continue
+            task = self._build_task(description, analyses[i])
+            self._insert_task(task)
+            added.append(task)
+        self._append_log(added)
+        self._save_pending_batch(None)
+        return (f"Added {len(added)} of {len(descriptions)} tasks from batch {batch.id} "
+                f"({malformed} skipped for malformed responses)")
+
+    def prefetch_review(self):
+        """Start generating the review in the background while the user is at the menu"""
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+        self._prefetch = asyncio.create_task(self.full_review())
+        self._prefetch.add_done_callback(consume_exception)
+        self._prefetch_revision = self._revision
+
+    async def review(self, field):
+        """Print one section of the review, streaming it if it has to be generated now"""
+        printer = SectionPrinter(field)
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is not None and self._prefetch_revision == self._revision:
+            try:
+                review = await prefetch
+            except Exception:
+                review = await self.full_review(printer)
+        else:
+            if prefetch is not None:
+                prefetch.cancel()
+            review = await self.full_review(printer)
+        printer.finish(review[field])
+
+    async def full_review(self, printer=None):
+        """Use AI to produce recommendations and a progress report in a single request"""
+        if self._review is not None and self._review_revision == self._revision:
+            return self._review
+        if not self.tasks:
+            return {
+                'recommendations': "No tasks available for analysis",
+                'progress_report': "No tasks available for analysis"
+            }
+
+        revision = self._revision
+        prompt = self._report_prompt()
+        key = self._cache_key(self.reasoning_model, REVIEW_SYSTEM_PROMPT, prompt)
+        review = self.cache.get(key)
+        if not is_valid_review(review):
+            review = await self._request_review(prompt, printer)
+            self.cache[key] = review
+
+        self._review, self._review_revision = review, revision
+        return review
+
+    @api_retry
+    async def _request_review(self, prompt, printer=None):
+        await self.rate_limiter.acquire((len(REVIEW_SYSTEM_PROMPT) + len(prompt)) // 4 + 2 * REVIEW_MAX_TOKENS)
+        if printer is not None:
+            printer.restart()
+        # Prefilling the first header keeps Claude from adding a preamble
+        chunks = [REVIEW_HEADERS['recommendations']]
+        if printer is not None:
+            printer.feed(chunks[0])
+        async with self.client.messages.stream(
+            model=self.reasoning_model,
+            max_tokens=2 * REVIEW_MAX_TOKENS,
+            system=cached_system_prompt(REVIEW_SYSTEM_PROMPT),
             messages=[
                 {
                     "role": "user",
                     "content": prompt
+                },
+                {
+                    "role": "assistant",
+                    "content": chunks[0]
                 }
             ]
-        )
-        return message.content[0].text
+        ) as stream:
+            async for text in stream.text_stream:
+                chunks.append(text)
+                if printer is not None:
+                    printer.feed(text)
+        return parse_review("".join(chunks))
+
+    def _task_summary(self):
+        """One compact line per task, rebuilt only after the task list changes"""
+        key = (len(self.tasks), self._revision)
+        if self._summary_key != key:
+            self._summary = "\n".join(
+                f"{t['id']}|{t['status']}|{t['priority']}|{t['category']}|{t['description']}"
+                for t in self.tasks
+            )
+            self._summary_key = key
+        return self._summary
+
+    def _report_prompt(self):
+        context = f"""
+        Completed Tasks: {self._n_completed}
+        Pending Tasks: {self._n_pending}
+        Task Details (id|status|priority|category|description):
+        {self._task_summary()}
+        """
+
+        return f"Task data:\n{context}"
 
     def complete_task(self, task_id):
-        for task in self.tasks:
-            if task['id'] == task_id:
-                task['status'] = 'completed'
-                task['completed_at'] = datetime.now().isoformat()
-                self.task_history.append({
-                    'action': 'complete',
-                    'task_id': task_id,
-                    'timestamp': datetime.now().isoformat()
-                })
-                self.save_tasks()
-                return f"Completed task: {task['description']}"
-        return "Task not found"
+        task = self._by_id.get(task_id)
+        if task is None:
+            return "Task not found"
+
+        ts = _now().isoformat()
+        if task['status'] != 'completed':
+            self._n_pending -= 1
+            self._n_completed += 1
+        task['status'] = 'completed'
+        task['completed_at'] = ts
+        self.task_history.append({
+            'action': 'complete',
+            'task_id': task_id,
+            'timestamp': ts
+        })
+        self._append_log([{'op': 'complete', 'id': task_id, 'ts': ts}])
+        return f"Completed task: {task['description']}"
 
     def display_tasks(self):
         if not self.tasks:
@@ -150,17 +607,28 @@ class AITaskAgent:
                            f"(Priority: {task['priority']}, Category: {task['category']})")
         return "\n".join(task_list)
 
-def display_menu():
+async def display_menu():
     print("\n=== AI Task Manager ===")
     print("1. Add new task")
     print("2. View all tasks")
     print("3. Get AI recommendations")
     print("4. Generate progress report")
     print("5. Mark task as complete")
-    print("6. Exit")
-    return input("Choose an option (1-6): ")
+    print("6. Add multiple tasks")
+    print("7. Bulk import tasks from file / check pending import")
+    print("8. Exit")
+    return await ainput("Choose an option (1-8): ")
 
-def main():
+async def read_task_descriptions():
+    print("\nEnter task descriptions, one per line (blank line to finish):")
+    descriptions = []
+    while True:
+        line = await ainput("> ")
+        if not line.strip():
+            return descriptions
+        descriptions.append(line.strip())
+
+async def main():
     load_dotenv()
     api_key = os.getenv('ANTHROPIC_API_KEY')
 
@@ -168,53 +636,84 @@ def main():
         raise ValueError("No API key found. Make sure ANTHROPIC_API_KEY is set in your .env file")
 
     agent = AITaskAgent(api_key=api_key)
+    if agent.pending_batch:
+        print(f"Batch {agent.pending_batch['batch_id']} from an earlier bulk import is pending, choose option 7 to check on it")
     
-    while True:
-        choice = display_menu()
+    try:
+        while True:
+            choice = await display_menu()
         
-        try:
-            if choice == '1':
-                task_description = input("\nEnter task description: ")
-                result = agent.add_task(task_description)
-                print("\nTask added with AI analysis:")
-                print(result)
-
-            elif choice == '2':
-                print("\nCurrent Tasks:")
-                print(agent.display_tasks())
-
-            elif choice == '3':
-                print("\nGetting AI Recommendations...")
-                recommendations = agent.get_smart_recommendations()
-                print(recommendations)
-
-            elif choice == '4':
-                print("\nGenerating Progress Report...")
-                report = agent.generate_progress_report()
-                print(report)
-
-            elif choice == '5':
-                print("\nCurrent Tasks:")
-                print(agent.display_tasks())
-                task_id = input("Enter task ID to mark as complete: ")
-                if task_id.isdigit():
-                    result = agent.complete_task(int(task_id))
+            try:
+                if choice == '1':
+                    task_description = await ainput("\nEnter task description: ")
+                    result = await agent.add_task(task_description)
+                    print("\nTask added with AI analysis:")
                     print(result)
-                else:
-                    print("Please enter a valid task ID")
+                    agent.prefetch_review()
+
+                elif choice == '2':
+                    print("\nCurrent Tasks:")
+                    print(agent.display_tasks())
 
-            elif choice == '6':
-                print("Thank you for using AI Task Manager!")
-                break
+                elif choice == '3':
+                    print("\nGetting AI Recommendations...")
+                    await agent.review('recommendations')
 
-            else:
-                print("Invalid choice. Please try again.")
+                elif choice == '4':
+                    print("\nGenerating Progress Report...")
+                    await agent.review('progress_report')
+
+                elif choice == '5':
+                    print("\nCurrent Tasks:")
+                    print(agent.display_tasks())
+                    task_id = await ainput("Enter task ID to mark as complete: ")
+                    if task_id.isdigit():
+                        result = agent.complete_task(int(task_id))
+                        print(result)
+                        agent.prefetch_review()
+                    else:
+                        print("Please enter a valid task ID")
+
+                elif choice == '6':
+                    descriptions = await read_task_descriptions()
+                    if descriptions:
+                        result = await agent.add_tasks(descriptions)
+                        print("\nTasks added with AI analysis:")
+                        print(result)
+                        agent.prefetch_review()
+                    else:
+                        print("No tasks entered")
+
+                elif choice == '7':
+                    if agent.pending_batch:
+                        result = await agent.check_batch()
+                        print(result)
+                        agent.prefetch_review()
+                    else:
+                        path = await ainput("\nEnter path to a file with one task per line: ")
+                        with open(path, 'r') as f:
+                            descriptions = [line.strip() for line in f if line.strip()]
+                        if descriptions:
+                            result = await agent.bulk_add_tasks(descriptions)
+                            print(result)
+                        else:
+                            print("No tasks found in file")
+
+                elif choice == '8':
+                    print("Thank you for using AI Task Manager!")
+                    break
+
+                else:
+                    print("Invalid choice. Please try again.")
 
-            input("\nPress Enter to continue...")
+                await ainput("\nPress Enter to continue...")
 
-        except Exception as e:
-            print(f"An error occurred: {str(e)}")
-            input("\nPress Enter to continue...")
+            except Exception as e:
+                print(f"An error occurred: {str(e)}")
+                await ainput("\nPress Enter to continue...")
+    finally:
+        # Close the connection pool on every exit path, including Ctrl-C and EOF
+        await agent.aclose()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file